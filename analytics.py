@@ -0,0 +1,253 @@
+import os
+import sys
+import glob
+import hashlib
+import subprocess
+import pandas as pd
+import numpy as np
+import joblib
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+
+# Trained models are persisted here, one file per data version
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+FORECAST_DAYS = 14
+N_CLUSTERS = 3
+CALENDAR_WEEKS = 54
+
+
+def daily_rollup(tasks_df):
+    """Collapse the activity log into one row per day and category"""
+    if tasks_df.empty:
+        return pd.DataFrame(columns=["Date", "Category", "Points", "Count"])
+    df = tasks_df[["Date", "Category", "Points"]].dropna(subset=["Date"]).copy()
+    df["Date"] = pd.to_datetime(df["Date"]).dt.normalize()
+    df["Points"] = pd.to_numeric(df["Points"], errors="coerce").fillna(0)
+    rollup = df.groupby(["Date", "Category"])["Points"].agg(["sum", "count"]).reset_index()
+    rollup.columns = ["Date", "Category", "Points", "Count"]
+    return rollup.sort_values(["Date", "Category"]).reset_index(drop=True)
+
+
+def data_version(rollup):
+    """Stable key identifying the contents of a daily rollup"""
+    hashed = pd.util.hash_pandas_object(rollup, index=False).values
+    return hashlib.sha1(hashed.tobytes()).hexdigest()[:16]
+
+
+def calendar_grid(rollup, categories=None):
+    """Bin daily points into a (years, 7 weekdays, 54 weeks) calendar grid.
+
+    Days are binned with numpy.bincount over their offset into the year range, so the
+    cost stays linear in the number of rollup rows. Cells outside a year are NaN.
+    Returns (years, grid, dates).
+    """
+    if rollup.empty:
+        return np.array([], dtype=int), np.zeros((0, 7, CALENDAR_WEEKS)), np.zeros((0, 7, CALENDAR_WEEKS), dtype="datetime64[D]")
+
+    # The year range comes from the full rollup so toggling categories keeps the layout stable
+    all_years = rollup["Date"].values.astype("datetime64[D]").astype("datetime64[Y]").astype(int) + 1970
+    years = np.arange(all_years.min(), all_years.max() + 1)
+    year_starts = (years - 1970).astype("datetime64[Y]").astype("datetime64[D]")
+    # 1970-01-01 was a Thursday; shift so that Monday == 0
+    start_weekdays = (year_starts.astype(int) + 3) % 7
+
+    if categories is not None:
+        rollup = rollup[rollup["Category"].isin(categories)]
+
+    days = rollup["Date"].values.astype("datetime64[D]")
+    year_index = days.astype("datetime64[Y]").astype(int) + 1970 - years[0]
+    offsets = (days - year_starts[year_index]).astype(int) + start_weekdays[year_index]
+    bins = (year_index * 7 + offsets % 7) * CALENDAR_WEEKS + offsets // 7
+    size = len(years) * 7 * CALENDAR_WEEKS
+    # bincount returns int64 for empty input, so force float to allow the NaN padding below
+    grid = np.bincount(bins, weights=rollup["Points"].values.astype(float), minlength=size).astype(float)
+    grid = grid.reshape(len(years), 7, CALENDAR_WEEKS)
+
+    cell_offsets = np.arange(CALENDAR_WEEKS)[None, None, :] * 7 + np.arange(7)[None, :, None]
+    dates = year_starts[:, None, None] + (cell_offsets - start_weekdays[:, None, None])
+    in_year = dates.astype("datetime64[Y]") == year_starts.astype("datetime64[Y]")[:, None, None]
+    grid[~in_year] = np.nan
+    return years, grid, dates
+
+
+def model_path(version):
+    return os.path.join(MODELS_DIR, f"analytics_{version}.joblib")
+
+
+def load_models(version):
+    """Return the persisted model bundle for a data version, or None if not trained yet"""
+    path = model_path(version)
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception:
+        return None
+
+
+def load_latest_models():
+    """Return the most recently trained model bundle, whatever its data version"""
+    paths = glob.glob(os.path.join(MODELS_DIR, "analytics_*.joblib"))
+    if not paths:
+        return None
+    try:
+        return joblib.load(max(paths, key=os.path.getmtime))
+    except Exception:
+        return None
+
+
+def _forecast_features(day_index, weekdays):
+    one_hot = np.eye(7)[weekdays]
+    return np.column_stack([day_index, one_hot])
+
+
+def fit_forecast(rollup):
+    """Fit a linear trend + weekday model on daily totals and predict the coming days"""
+    daily = rollup.groupby("Date")["Points"].sum()
+    days = pd.date_range(daily.index.min(), daily.index.max(), freq="D")
+    daily = daily.reindex(days, fill_value=0)
+
+    day_index = np.arange(len(days))
+    X = _forecast_features(day_index, days.dayofweek.values)
+    y = daily.values
+
+    score = None
+    if len(days) >= 10:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+        score = LinearRegression().fit(X_train, y_train).score(X_test, y_test)
+
+    model = LinearRegression().fit(X, y)
+
+    future_days = pd.date_range(days[-1] + pd.Timedelta(days=1), periods=FORECAST_DAYS, freq="D")
+    future_index = np.arange(len(days), len(days) + FORECAST_DAYS)
+    predicted = model.predict(_forecast_features(future_index, future_days.dayofweek.values))
+    forecast = pd.DataFrame({"Date": future_days, "Points": np.clip(predicted, 0, None)})
+    return model, forecast, score
+
+
+def _cluster_features(rollup, categories, scaler):
+    """Weekday on the unit circle (so Sunday sits next to Monday), one-hot category, scaled points"""
+    angle = 2 * np.pi * rollup["Date"].dt.dayofweek.values / 7
+    category_codes = pd.Categorical(rollup["Category"].astype(str), categories=categories).codes
+    points = scaler.transform(rollup[["Points"]].values.astype(float))
+    return np.column_stack([np.sin(angle), np.cos(angle), np.eye(len(categories))[category_codes], points])
+
+
+def fit_clusters(rollup, previous=None):
+    """Cluster day/category activity by weekday, category and points"""
+    categories = sorted(rollup["Category"].astype(str).unique())
+    n_clusters = min(N_CLUSTERS, len(rollup))
+    if n_clusters < 2:
+        return None, None, None
+
+    scaler = StandardScaler().fit(rollup[["Points"]].values.astype(float))
+    X = _cluster_features(rollup, categories, scaler)
+
+    # Warm-start from the previous centers so retraining only nudges the existing clusters.
+    # Centers are only comparable when the one-hot category columns line up.
+    init, n_init = "k-means++", 10
+    if previous is not None and previous.get("kmeans") is not None:
+        old_kmeans, old_scaler = previous["kmeans"], previous["scaler"]
+        if previous.get("categories") == categories and old_kmeans.n_clusters == n_clusters \
+                and old_kmeans.cluster_centers_.shape[1] == X.shape[1]:
+            init = old_kmeans.cluster_centers_.copy()
+            init[:, -1:] = scaler.transform(old_scaler.inverse_transform(init[:, -1:]))
+            n_init = 1
+
+    kmeans = KMeans(n_clusters=n_clusters, init=init, n_init=n_init, random_state=42).fit(X)
+
+    clusters = rollup[["Date", "Category", "Points"]].copy()
+    clusters["Weekday"] = clusters["Date"].dt.day_name()
+    clusters["Cluster"] = [f"Pattern {label + 1}" for label in kmeans.labels_]
+    return kmeans, scaler, clusters
+
+
+def train_models(rollup, version):
+    """Train forecast and clustering models for a rollup and persist them under its version.
+
+    Runs in a separate process (see start_training), so it only touches its arguments and the disk.
+    """
+    path = model_path(version)
+    if os.path.exists(path):
+        return path
+
+    rollup = rollup.copy()
+    rollup["Date"] = pd.to_datetime(rollup["Date"])
+    previous = load_latest_models()
+
+    regressor, forecast, score = fit_forecast(rollup)
+    kmeans, scaler, clusters = fit_clusters(rollup, previous)
+
+    bundle = {
+        "version": version,
+        "regressor": regressor,
+        "forecast": forecast,
+        "score": score,
+        "kmeans": kmeans,
+        "scaler": scaler,
+        "categories": sorted(rollup["Category"].astype(str).unique()),
+        "clusters": clusters,
+    }
+
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
+
+    # Keep only the most recent bundles around
+    stale = sorted(glob.glob(os.path.join(MODELS_DIR, "analytics_*.joblib")), key=os.path.getmtime)[:-3]
+    for old_path in stale:
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+    return path
+
+
+def _training_log_path(version):
+    return os.path.join(MODELS_DIR, f"train_{version}.log")
+
+
+def start_training(rollup, version):
+    """Launch train_models for a rollup in its own Python process and return the Popen handle.
+
+    The worker runs this module as a script, so it never imports (and re-runs) the Streamlit app.
+    """
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    rollup_path = os.path.join(MODELS_DIR, f"rollup_{version}.pkl")
+    rollup.to_pickle(rollup_path)
+    with open(_training_log_path(version), "w") as log:
+        return subprocess.Popen([sys.executable, "-m", "analytics", rollup_path, version],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stdout=log, stderr=subprocess.STDOUT)
+
+
+def training_error(version):
+    """Last line of a failed training run's output, for display"""
+    try:
+        with open(_training_log_path(version), "r") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    except OSError:
+        lines = []
+    return lines[-1] if lines else "training process exited unexpectedly"
+
+
+def remove_training_log(version):
+    """Delete a finished run's log; left to the parent since the worker holds it open as stdout"""
+    try:
+        os.remove(_training_log_path(version))
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    rollup_path, version = sys.argv[1], sys.argv[2]
+    try:
+        train_models(pd.read_pickle(rollup_path), version)
+    finally:
+        try:
+            os.remove(rollup_path)
+        except OSError:
+            pass
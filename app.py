@@ -4,21 +4,20 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import datetime
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
+import time
 import plotly.express as px
 import plotly.graph_objects as go
 import os
 import json
 from uuid import uuid4
+import analytics
+import storage
 
 # Files for data storage
-TASKS_FILE = "task_log.csv"
-HABITS_FILE = "habits.json"
-TODO_FILE = "todo.csv"
-REWARDS_FILE = "rewards.json"  # Add this line
+TASKS_FILE = storage.TASKS_FILE
+HABITS_FILE = storage.HABITS_FILE
+TODO_FILE = storage.TODO_FILE
+REWARDS_FILE = storage.REWARDS_FILE
 
 # Initialize files if they don't exist
 if not os.path.exists(TASKS_FILE):
@@ -26,7 +25,7 @@ if not os.path.exists(TASKS_FILE):
     df_init.to_csv(TASKS_FILE, index=False)
 
 if not os.path.exists(TODO_FILE):
-    todo_init = pd.DataFrame(columns=["ID", "Task", "Due Date", "Priority", "Status", "Points"])
+    todo_init = pd.DataFrame(columns=storage.TODO_COLUMNS)
     todo_init.to_csv(TODO_FILE, index=False)
 
 if not os.path.exists(HABITS_FILE):
@@ -55,9 +54,12 @@ if not os.path.exists(REWARDS_FILE):
     with open(REWARDS_FILE, "w") as f:
         json.dump(rewards_init, f, indent=4)
 
+# Move old activities and completed to-dos into the yearly archives (at most once a day)
+storage.rollover()
+
 # Load existing data
-tasks_df = pd.read_csv(TASKS_FILE)
-todo_df = pd.read_csv(TODO_FILE)
+tasks_df = storage.load_hot_tasks()
+todo_df = storage.load_todos()
 
 with open(HABITS_FILE, "r") as f:
     habits_data = json.load(f)
@@ -92,9 +94,9 @@ def load_task_data():
         return pd.DataFrame(columns=["Date", "Category", "Task", "Points", "Comment"])
 
 def load_data():
-    """Reload all data sources"""
-    tasks_df = pd.read_csv(TASKS_FILE)
-    todo_df = pd.read_csv(TODO_FILE)
+    """Reload all data sources (recent activities and to-dos only, see storage.load_tasks for history)"""
+    tasks_df = storage.load_hot_tasks()
+    todo_df = storage.load_todos()
     with open(HABITS_FILE, "r") as f:
         habits_data = json.load(f)
     with open(REWARDS_FILE, "r") as f:
@@ -103,8 +105,7 @@ def load_data():
 
 def calculate_available_points():
     """Calculate available points (total minus redeemed)"""
-    tasks_df = pd.read_csv(TASKS_FILE)
-    total_earned = tasks_df["Points"].sum() if not tasks_df.empty else 0
+    total_earned = storage.task_totals()["points"]
     
     with open(REWARDS_FILE, "r") as f:
         rewards_data = json.load(f)
@@ -113,6 +114,70 @@ def calculate_available_points():
     
     return total_earned - redeemed_points
 
+# Wait this long before retrying a data version whose training process failed
+TRAINING_RETRY_SECONDS = 60
+
+@st.cache_resource
+def get_training_jobs():
+    """Training processes shared across sessions, keyed by data version"""
+    return {}
+
+def get_analytics_models(rollup):
+    """Return (bundle, is_current, error) without ever waiting on model fitting.
+
+    If no models exist for the current data version, training is started in a
+    background process and the most recent older bundle is returned in the meantime.
+    A failed (or killed) training run is retried after TRAINING_RETRY_SECONDS.
+    """
+    jobs = get_training_jobs()
+    # Successful runs are done with their logs; failed ones keep theirs for the error message
+    for finished_version in [v for v, j in jobs.items() if j["process"].poll() == 0]:
+        analytics.remove_training_log(finished_version)
+        jobs.pop(finished_version)
+
+    version = analytics.data_version(rollup)
+    bundle = analytics.load_models(version)
+    if bundle is not None:
+        return bundle, True, None
+
+    error = None
+    job = jobs.get(version)
+    if job is not None and job["process"].poll() is not None:
+        error = analytics.training_error(version)
+        if time.time() - job["started"] >= TRAINING_RETRY_SECONDS:
+            jobs.pop(version)
+
+    # Train one data version at a time; finished jobs for older versions are superseded
+    if version not in jobs and all(j["process"].poll() is not None for j in jobs.values()):
+        for old_version in [v for v in jobs if v != version]:
+            jobs.pop(old_version)
+        jobs[version] = {"process": analytics.start_training(rollup, version), "started": time.time()}
+    return analytics.load_latest_models(), False, error
+
+@st.cache_data(max_entries=32)
+def get_calendar_grid(version, categories, _rollup):
+    """Calendar heatmap grid, cached per data version and category selection"""
+    return analytics.calendar_grid(_rollup, list(categories))
+
+def build_calendar_heatmap(years, grid, dates):
+    """Stack one 7 x 54 block per year (most recent first) into a single compact heatmap"""
+    block = 8  # 7 weekdays plus a blank spacer row between years
+    z = np.full((len(years) * block, analytics.CALENDAR_WEEKS), np.nan)
+    text = np.full(z.shape, "", dtype=object)
+    for i, year_index in enumerate(range(len(years) - 1, -1, -1)):
+        z[i * block:i * block + 7] = grid[year_index]
+        text[i * block:i * block + 7] = np.datetime_as_string(dates[year_index])
+    
+    fig = go.Figure(go.Heatmap(z=z, text=text, colorscale="Greens", xgap=1, ygap=1, hoverongaps=False,
+                               hovertemplate="%{text}: %{z:.0f} points<extra></extra>"))
+    fig.update_layout(height=60 + len(years) * block * 10, margin=dict(l=40, r=10, t=30, b=10),
+                      title="Points per Day")
+    fig.update_xaxes(showticklabels=False, showgrid=False, zeroline=False)
+    fig.update_yaxes(autorange="reversed", showgrid=False, zeroline=False,
+                     tickvals=[i * block + 3 for i in range(len(years))],
+                     ticktext=[str(year) for year in years[::-1]])
+    return fig
+
 # Add welcome message and explanation on Dashboard
 if page == "🏠 Dashboard":
     st.title("🎯 Welcome to InnerLevel")
@@ -129,20 +194,19 @@ if page == "🏠 Dashboard":
     # Load the latest data
     tasks_df, todo_df, habits_data, rewards_data = load_data()
     
-    # Calculate metrics
-    total_points = tasks_df["Points"].sum() if not tasks_df.empty else 0
+    # Calculate metrics (all-time figures include the totals carried forward from the archive)
+    totals = storage.task_totals(tasks_df)
+    total_points = totals["points"]
+    tasks_completed = totals["count"]
     if not tasks_df.empty:
         tasks_this_week = tasks_df[tasks_df["Date"] >= (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d")]
         points_this_week = tasks_this_week["Points"].sum()
-        
-        # Get professional vs personal split
-        category_split = tasks_df.groupby("Category")["Points"].sum()
-        professional_points = category_split.get("Professional", 0)
-        personal_points = category_split.get("Personal", 0)
     else:
         points_this_week = 0
-        professional_points = 0
-        personal_points = 0
+    
+    # Get professional vs personal split
+    professional_points = totals["by_category"].get("Professional", {}).get("points", 0)
+    personal_points = totals["by_category"].get("Personal", {}).get("points", 0)
     
     # Display metrics
     col1, col2, col3 = st.columns(3)
@@ -151,7 +215,7 @@ if page == "🏠 Dashboard":
     with col2:
         st.metric("Points This Week", points_this_week)
     with col3:
-        st.metric("Tasks Completed", len(tasks_df))
+        st.metric("Tasks Completed", tasks_completed)
     
     # Display category breakdown
     st.subheader("Points by Category")
@@ -221,12 +285,11 @@ elif page == "📝 Log Activity":
         if quick_submit:
             new_row = pd.DataFrame([[date.strftime("%Y-%m-%d"), selected_category, habit_name, habit_points, comment]],
                                    columns=["Date", "Category", "Task", "Points", "Comment"])
-            updated_tasks_df = pd.concat([tasks_df, new_row], ignore_index=True)
-            updated_tasks_df.to_csv(TASKS_FILE, index=False)
+            storage.append_tasks(new_row)
             st.success(f"✅ Activity logged: {habit_name} for {habit_points} points!")
             
             # Refresh data
-            tasks_df = pd.read_csv(TASKS_FILE)
+            tasks_df, todo_df, habits_data, rewards_data = load_data()
     
     with log_tab2:
         st.subheader("Log Custom Activity")
@@ -245,12 +308,11 @@ elif page == "📝 Log Activity":
             else:
                 new_row = pd.DataFrame([[c_date.strftime("%Y-%m-%d"), c_category, c_task, c_points, c_comment]],
                                        columns=["Date", "Category", "Task", "Points", "Comment"])
-                updated_tasks_df = pd.concat([tasks_df, new_row], ignore_index=True)
-                updated_tasks_df.to_csv(TASKS_FILE, index=False)
+                storage.append_tasks(new_row)
                 st.success(f"✅ Custom activity logged: {c_task} for {c_points} points!")
                 
                 # Refresh data
-                tasks_df = pd.read_csv(TASKS_FILE)
+                tasks_df, todo_df, habits_data, rewards_data = load_data()
     
     # Activity History
     st.subheader("Activity History")
@@ -258,7 +320,8 @@ elif page == "📝 Log Activity":
     # Filters
     col1, col2 = st.columns(2)
     with col1:
-        category_options = ["All"] + list(tasks_df["Category"].unique()) if not tasks_df.empty else ["All"]
+        # Categories from archived years too, without loading the archive itself
+        category_options = ["All"] + sorted(storage.task_totals(tasks_df)["by_category"])
         filter_category = st.multiselect("Filter by Category", 
                                         options=category_options,
                                         default="All")
@@ -267,15 +330,15 @@ elif page == "📝 Log Activity":
                                   value=(datetime.date.today() - datetime.timedelta(days=30), datetime.date.today()),
                                   max_value=datetime.date.today())
     
-    # Apply filters
-    filtered_df = tasks_df.copy()
+    # Apply filters (archived years are only loaded when the date range reaches into them)
+    if len(date_range) == 2:
+        start_date, end_date = date_range
+        filtered_df = storage.load_tasks(start_date, end_date)
+    else:
+        filtered_df = tasks_df.copy()
+    
     if filter_category and "All" not in filter_category:
         filtered_df = filtered_df[filtered_df["Category"].isin(filter_category)]
-
-    if len(date_range) == 2 and not filtered_df.empty:
-        start_date, end_date = date_range
-        filtered_df = filtered_df[(filtered_df["Date"] >= start_date.strftime("%Y-%m-%d")) & 
-                                 (filtered_df["Date"] <= end_date.strftime("%Y-%m-%d"))]
     
     # Show filtered results
     if not filtered_df.empty:
@@ -422,12 +485,11 @@ elif page == "📋 To-Do List":
         else:
             new_todo = pd.DataFrame([[str(uuid4()), todo_task, due_date.strftime("%Y-%m-%d"), priority, "Pending", todo_points]],
                                    columns=["ID", "Task", "Due Date", "Priority", "Status", "Points"])
-            todo_df = pd.concat([todo_df, new_todo], ignore_index=True)
-            todo_df.to_csv(TODO_FILE, index=False)
+            storage.add_todos(new_todo)
             st.success(f"✅ New to-do item added: {todo_task}")
             
             # Refresh data
-            todo_df = pd.read_csv(TODO_FILE)
+            todo_df = storage.load_todos()
     
     # Display and manage todo items
     st.subheader("Your To-Do List")
@@ -475,35 +537,37 @@ elif page == "📋 To-Do List":
                 with col2:
                     if status != "Completed":
                         if st.button("Mark Complete", key=f"complete_{task_id}"):
-                            # Update status to completed
-                            todo_df.loc[todo_df["ID"] == task_id, "Status"] = "Completed"
-                            todo_df.to_csv(TODO_FILE, index=False)
-                            
-                            # Log the completed task as an activity
-                            new_activity = pd.DataFrame([
-                                [datetime.date.today().strftime("%Y-%m-%d"), 
-                                 "Personal", 
-                                 f"Completed: {task}", 
-                                 points, 
-                                 f"Completed to-do item: {task}"]
-                            ], columns=["Date", "Category", "Task", "Points", "Comment"])
-                            
-                            tasks_df = pd.concat([tasks_df, new_activity], ignore_index=True)
-                            tasks_df.to_csv(TASKS_FILE, index=False)
+                            # Update status to completed and log it as an activity
+                            try:
+                                storage.commit_batch(pd.DataFrame(columns=storage.TASK_COLUMNS), [task_id])
+                            except ValueError as e:
+                                st.error(str(e))
+                                st.stop()
                             
                             st.success(f"✅ Task completed: {task} (+{points} points)")
                             st.rerun()
                 
                 with col3:
                     if st.button("Remove", key=f"remove_{task_id}"):
-                        todo_df = todo_df[todo_df["ID"] != task_id]
-                        todo_df.to_csv(TODO_FILE, index=False)
+                        storage.remove_todos([task_id])
                         st.success(f"✅ Task removed: {task}")
                         st.rerun()
                 
                 st.markdown("---")
     else:
         st.info("No to-do items match your filter criteria.")
+    
+    # Completed items older than the archive horizon live in the yearly archives
+    if status_filter in ["All", "Completed"]:
+        if st.checkbox("Show archived completed items"):
+            archived_todo = storage.load_archived_todos()
+            if priority_filter and "All" not in priority_filter:
+                archived_todo = archived_todo[archived_todo["Priority"].isin(priority_filter)]
+            if not archived_todo.empty:
+                st.dataframe(archived_todo[["Task", "Due Date", "Priority", "Points", "Completed On"]].sort_values(
+                    by="Due Date", ascending=False), use_container_width=True)
+            else:
+                st.info("No archived to-do items yet.")
 
 # Add explanatory text for Rewards
 elif page == "🎁 Rewards":
@@ -647,16 +711,22 @@ elif page == "📊 Analytics":
     - Most productive days
     - Category distribution
     - Activity streaks
+    - Points forecast and activity patterns
     """)
     
     tasks_df, todo_df, habits_data, rewards_data = load_data()
     
+    # All-time analytics need the full history, including archived years
+    tasks_df = storage.load_tasks()
+    
     if not tasks_df.empty:
         # Convert Date to datetime
         tasks_df['Date'] = pd.to_datetime(tasks_df['Date'])
+        rollup = analytics.daily_rollup(tasks_df)
+        data_version = analytics.data_version(rollup)
         
         # Create tabs for different analyses
-        analysis_tab1, analysis_tab2, analysis_tab3 = st.tabs(["Productivity Analysis", "Trends & Patterns", "Task Categories"])
+        analysis_tab1, analysis_tab2, analysis_tab3, analysis_tab4 = st.tabs(["Productivity Analysis", "Trends & Patterns", "Task Categories", "Forecast & Clusters"])
         
         with analysis_tab1:
             st.subheader("Daily Productivity Analysis")
@@ -680,6 +750,17 @@ elif page == "📊 Analytics":
         with analysis_tab2:
             st.subheader("Trends & Patterns")
             
+            # Calendar heatmap of points per day
+            all_categories = sorted(rollup['Category'].astype(str).unique())
+            calendar_categories = st.multiselect("Calendar Categories",
+                                                 options=all_categories,
+                                                 default=all_categories)
+            if calendar_categories:
+                years, calendar, calendar_dates = get_calendar_grid(data_version, tuple(calendar_categories), rollup)
+                st.plotly_chart(build_calendar_heatmap(years, calendar, calendar_dates), use_container_width=True)
+            else:
+                st.info("Select at least one category to see your activity calendar.")
+            
             # Time series of points
             daily_total = tasks_df.groupby('Date')['Points'].sum().reset_index()
             fig_trend = px.line(daily_total, 
@@ -728,6 +809,63 @@ elif page == "📊 Analytics":
                              title='Top 10 Most Frequent Tasks',
                              labels={'value': 'Count', 'index': 'Task'})
             st.plotly_chart(fig_tasks, use_container_width=True)
+        
+        with analysis_tab4:
+            st.subheader("Points Forecast")
+            
+            # Models are fitted in a background process and cached on disk per data version
+            models, models_current, training_error = get_analytics_models(rollup)
+            
+            if training_error is not None:
+                st.error(f"Error training analytics models: {training_error}")
+            elif not models_current:
+                st.caption("⏳ Updating models with your latest activities in the background...")
+            
+            if models is None:
+                st.info("Your forecast and activity patterns are being prepared. Check back in a moment!")
+            else:
+                daily_total = rollup.groupby('Date')['Points'].sum().reset_index()
+                fig_forecast = go.Figure()
+                fig_forecast.add_trace(go.Scatter(x=daily_total['Date'], y=daily_total['Points'],
+                                                  mode='lines', name='Actual'))
+                fig_forecast.add_trace(go.Scatter(x=models["forecast"]['Date'], y=models["forecast"]['Points'],
+                                                  mode='lines', name='Forecast', line=dict(dash='dash')))
+                fig_forecast.update_layout(title=f'Next {analytics.FORECAST_DAYS} Days Forecast',
+                                           xaxis_title='Date', yaxis_title='Points')
+                st.plotly_chart(fig_forecast, use_container_width=True)
+                
+                forecast_col1, forecast_col2 = st.columns(2)
+                with forecast_col1:
+                    st.metric(f"Expected Points (next {analytics.FORECAST_DAYS} days)",
+                              f"{models['forecast']['Points'].sum():.0f}")
+                with forecast_col2:
+                    if models["score"] is not None:
+                        st.metric("Forecast Fit (R²)", f"{models['score']:.2f}",
+                                  help="How well the model predicted your most recent days when held out")
+                
+                st.subheader("Activity Patterns")
+                clusters = models["clusters"]
+                if clusters is not None:
+                    fig_clusters = px.scatter(clusters,
+                                              x='Weekday',
+                                              y='Points',
+                                              color='Cluster',
+                                              symbol='Category',
+                                              category_orders={'Weekday': ['Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                                                                           'Friday', 'Saturday', 'Sunday']},
+                                              title='Activity Clusters by Weekday, Category and Points')
+                    st.plotly_chart(fig_clusters, use_container_width=True)
+                    
+                    cluster_stats = clusters.groupby('Cluster').agg(
+                        Days=('Date', 'count'),
+                        Avg_Points=('Points', 'mean'),
+                        Top_Weekday=('Weekday', lambda s: s.mode().iat[0]),
+                        Top_Category=('Category', lambda s: s.mode().iat[0]),
+                    ).round(2)
+                    cluster_stats.columns = ['Days', 'Avg Points', 'Top Weekday', 'Top Category']
+                    st.dataframe(cluster_stats, use_container_width=True)
+                else:
+                    st.info("Log a few more activities to discover your activity patterns!")
             
     else:
         st.info("Start logging activities to see your analytics!")
@@ -0,0 +1,206 @@
+"""Batch ingestion for InnerLevel, for scripts and git hooks that should not go through the UI.
+
+Log a habit from the command line:
+
+    python ingest.py log "Daily Coding" --comment "Fixed the login bug"
+
+Import a batch from a JSON file (or "-" for stdin):
+
+    python ingest.py batch events.json
+
+Or run a local HTTP endpoint and POST batches to http://127.0.0.1:8765/batch:
+
+    python ingest.py serve
+
+A batch is a JSON object such as:
+
+    {
+        "activities": [{"task": "Daily Coding", "date": "2025-05-04", "comment": "..."}],
+        "todo_completions": ["6d950dfa-5ed3-4189-b02f-e6d264fe8723"]
+    }
+
+Activities must name a habit from habits.json, which provides their category and points.
+Each batch is validated as a whole and committed in one write through storage.py.
+"""
+import os
+import sys
+import json
+import datetime
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import storage
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+_habits_cache = {}
+
+
+def load_habits():
+    """Habits keyed by name, re-read only when habits.json changes"""
+    mtime = os.path.getmtime(storage.HABITS_FILE)
+    if _habits_cache.get("mtime") != mtime:
+        with open(storage.HABITS_FILE, "r") as f:
+            habits_data = json.load(f)
+        _habits_cache["habits"] = {habit["name"]: habit for habit in habits_data["habits"]}
+        _habits_cache["mtime"] = mtime
+    return _habits_cache["habits"]
+
+
+def validate_activities(records, today=None):
+    """Turn activity records into task log rows, or raise ValueError listing every invalid record"""
+    columns = storage.TASK_COLUMNS
+    if not records:
+        return pd.DataFrame(columns=columns)
+    if not all(isinstance(record, dict) for record in records):
+        raise ValueError("Each activity must be a JSON object")
+
+    today = today or datetime.date.today()
+    habits = load_habits()
+    df = pd.DataFrame.from_records(records).reindex(columns=["task", "date", "comment"])
+
+    errors = []
+    known = df["task"].isin(list(habits))
+    for i in df.index[~known]:
+        errors.append(f"activities[{i}]: unknown habit {df.at[i, 'task']!r}")
+
+    dates = pd.to_datetime(df["date"].fillna(today.strftime("%Y-%m-%d")), format="%Y-%m-%d", errors="coerce")
+    for i in df.index[dates.isna()]:
+        errors.append(f"activities[{i}]: invalid date {df.at[i, 'date']!r}, expected YYYY-MM-DD")
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    return pd.DataFrame({
+        "Date": dates.dt.strftime("%Y-%m-%d"),
+        "Category": df["task"].map({name: habit["category"] for name, habit in habits.items()}),
+        "Task": df["task"],
+        "Points": df["task"].map({name: habit["points"] for name, habit in habits.items()}),
+        "Comment": df["comment"].fillna("").astype(str),
+    }, columns=columns)
+
+
+def validate_todo_completions(records):
+    """Turn to-do completions (ID strings or {"id": "..."} objects) into a list of IDs"""
+    todo_ids, errors = [], []
+    for i, record in enumerate(records):
+        if isinstance(record, dict):
+            if record.get("id") is None:
+                errors.append(f"todo_completions[{i}]: missing 'id'")
+                continue
+            record = record["id"]
+        if not isinstance(record, str):
+            errors.append(f"todo_completions[{i}]: expected an ID string or {{\"id\": \"...\"}}, got {record!r}")
+            continue
+        todo_ids.append(record)
+    if errors:
+        raise ValueError("; ".join(errors))
+    return todo_ids
+
+
+def ingest_batch(batch):
+    """Validate and commit one batch; returns how many activities and to-dos were recorded"""
+    if not isinstance(batch, dict):
+        raise ValueError("A batch must be a JSON object")
+    for field in ("activities", "todo_completions"):
+        if not isinstance(batch.get(field, []), list):
+            raise ValueError(f"'{field}' must be a list")
+    activities = validate_activities(batch.get("activities", []))
+    todo_ids = validate_todo_completions(batch.get("todo_completions", []))
+    completed = storage.commit_batch(activities, todo_ids)
+    return {"activities": len(activities), "todo_completions": len(completed)}
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/batch":
+            self._send_json(404, {"error": "Not found"})
+            return
+        if self.headers.get("Content-Length") is None:
+            self._send_json(411, {"error": "Content-Length header is required"})
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "Batch too large"})
+            return
+        try:
+            result = ingest_batch(json.loads(self.rfile.read(length) or b"{}"))
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": f"Error saving batch: {str(e)}"})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=DEFAULT_PORT):
+    # Bound to localhost only: there is no authentication
+    server = ThreadingHTTPServer(("127.0.0.1", port), IngestHandler)
+    print(f"InnerLevel ingestion API listening on http://127.0.0.1:{port}/batch")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Log InnerLevel activities without the Streamlit UI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    log_parser = subparsers.add_parser("log", help="Log a single habit")
+    log_parser.add_argument("habit", help="Habit name from habits.json")
+    log_parser.add_argument("--date", help="Date as YYYY-MM-DD (defaults to today)")
+    log_parser.add_argument("--comment", default="")
+
+    batch_parser = subparsers.add_parser("batch", help="Ingest a JSON batch from a file or stdin")
+    batch_parser.add_argument("file", help="Path to a JSON batch, or - for stdin")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the local HTTP ingestion endpoint")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.port)
+        return 0
+
+    try:
+        if args.command == "log":
+            batch = {"activities": [{"task": args.habit, "date": args.date, "comment": args.comment}]}
+        elif args.file == "-":
+            batch = json.load(sys.stdin)
+        else:
+            with open(args.file, "r") as f:
+                batch = json.load(f)
+        result = ingest_batch(batch)
+    except (ValueError, OSError) as e:
+        # json.JSONDecodeError is a ValueError too
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"✅ Logged {result['activities']} activities and {result['todo_completions']} to-do completions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
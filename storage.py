@@ -0,0 +1,437 @@
+import os
+import glob
+import json
+import time
+import datetime
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# Files for data storage
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+TASKS_FILE = os.path.join(DATA_DIR, "task_log.csv")
+HABITS_FILE = os.path.join(DATA_DIR, "habits.json")
+TODO_FILE = os.path.join(DATA_DIR, "todo.csv")
+REWARDS_FILE = os.path.join(DATA_DIR, "rewards.json")
+
+# Cold storage: one compressed file per year plus carried-forward totals
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+ARCHIVE_SUMMARY_FILE = os.path.join(ARCHIVE_DIR, "summary.json")
+
+# Held while writing so the Streamlit UI and the ingestion API never interleave writes
+LOCK_FILE = os.path.join(DATA_DIR, ".innerlevel.lock")
+_thread_lock = threading.Lock()
+
+# Activities and completed to-dos older than this many days are moved to the archive.
+# Never go below a week so "Points This Week" can always be answered from the hot files.
+def _horizon_from_env(default=365):
+    try:
+        return max(int(os.environ.get("INNERLEVEL_ARCHIVE_HORIZON_DAYS", default)), 7)
+    except ValueError:
+        return default
+
+
+ARCHIVE_HORIZON_DAYS = _horizon_from_env()
+
+TASK_COLUMNS = ["Date", "Category", "Task", "Points", "Comment"]
+TODO_COLUMNS = ["ID", "Task", "Due Date", "Priority", "Status", "Points", "Completed On"]
+
+
+def _as_date_str(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime, pd.Timestamp)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def _archive_path(kind, year):
+    return os.path.join(ARCHIVE_DIR, f"{kind}_{year}.csv.gz")
+
+
+def _archive_years(kind):
+    years = []
+    for path in glob.glob(os.path.join(ARCHIVE_DIR, f"{kind}_*.csv.gz")):
+        year = os.path.basename(path)[len(kind) + 1:-len(".csv.gz")]
+        if year.isdigit():
+            years.append(int(year))
+    return sorted(years)
+
+
+@lru_cache(maxsize=64)
+def _read_archive(path, mtime):
+    """Read one archive file; mtime is part of the cache key so rewrites are picked up"""
+    return pd.read_csv(path, compression="gzip")
+
+
+def _load_archive(kind, first_year=None, last_year=None):
+    # Rows written by a rollover that has not been committed yet are still counted in the hot files
+    pending = load_archive_summary()["pending_rollover"]
+    frames = []
+    for year in _archive_years(kind):
+        if (first_year is not None and year < first_year) or (last_year is not None and year > last_year):
+            continue
+        path = _archive_path(kind, year)
+        frame = _read_archive(path, os.path.getmtime(path))
+        if pending is not None and "Archived On" in frame.columns:
+            frame = frame[frame["Archived On"].astype(str) != pending["id"]]
+        # "Archived On" is rollover bookkeeping; archived activities look like hot ones to callers
+        if kind == "task_log":
+            frame = frame.drop(columns=["Archived On"], errors="ignore")
+        frames.append(frame)
+    return frames
+
+
+def _write_csv(df, path, **kwargs):
+    """Write a CSV through a temporary file so readers never see a half-written file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def locked():
+    """Exclusive lock over the data files, shared by every process using this module"""
+    with _thread_lock, open(LOCK_FILE, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        else:
+            # msvcrt locks a byte range; LK_LOCK gives up after ~10s, so keep retrying
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _totals(tasks_df):
+    if tasks_df.empty:
+        return {"points": 0.0, "count": 0, "by_category": {}}
+    points = pd.to_numeric(tasks_df["Points"], errors="coerce").fillna(0)
+    by_category = points.groupby(tasks_df["Category"].astype(str)).agg(["sum", "count"])
+    return {
+        "points": float(points.sum()),
+        "count": int(len(tasks_df)),
+        "by_category": {
+            category: {"points": float(row["sum"]), "count": int(row["count"])}
+            for category, row in by_category.iterrows()
+        },
+    }
+
+
+def _merge_totals(a, b):
+    merged = {"points": a["points"] + b["points"], "count": a["count"] + b["count"], "by_category": {}}
+    for totals in (a, b):
+        for category, values in totals["by_category"].items():
+            current = merged["by_category"].setdefault(category, {"points": 0.0, "count": 0})
+            current["points"] += values["points"]
+            current["count"] += values["count"]
+    return merged
+
+
+def load_archive_summary():
+    """Return the archive bookkeeping: cut-off dates and totals carried forward from archived activities"""
+    summary = {
+        "tasks_archived_before": None,
+        "todos_archived_before": None,
+        "last_rollover": None,
+        "pending_rollover": None,
+        "totals": {"points": 0.0, "count": 0, "by_category": {}},
+    }
+    if os.path.exists(ARCHIVE_SUMMARY_FILE):
+        with open(ARCHIVE_SUMMARY_FILE, "r") as f:
+            summary.update(json.load(f))
+    return summary
+
+
+def _save_archive_summary(summary):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp_path = f"{ARCHIVE_SUMMARY_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(summary, f, indent=4)
+    os.replace(tmp_path, ARCHIVE_SUMMARY_FILE)
+
+
+def load_hot_tasks():
+    """Load the hot activity file only (recent activities plus anything back-dated since the last rollover)"""
+    return pd.read_csv(TASKS_FILE)
+
+
+def load_tasks(start=None, end=None):
+    """Load activities, optionally limited to a date range.
+
+    Only the hot file is read unless the range reaches back before the archive
+    cut-off, in which case just the archived years that overlap are loaded.
+    """
+    start, end = _as_date_str(start), _as_date_str(end)
+    df = load_hot_tasks()
+
+    archived_before = load_archive_summary()["tasks_archived_before"]
+    if archived_before is not None and (start is None or start < archived_before):
+        first_year = int(start[:4]) if start else None
+        last_year = int(end[:4]) if end else None
+        frames = _load_archive("task_log", first_year, last_year)
+        if frames:
+            df = pd.concat(frames + [df], ignore_index=True)
+
+    if start is not None:
+        df = df[df["Date"] >= start]
+    if end is not None:
+        df = df[df["Date"] <= end]
+    return df
+
+
+def save_tasks(tasks_df):
+    _write_csv(tasks_df, TASKS_FILE)
+
+
+def _append_tasks_unlocked(rows):
+    columns = pd.read_csv(TASKS_FILE, nrows=0).columns
+    needs_newline = False
+    with open(TASKS_FILE, "rb") as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    text = rows.reindex(columns=columns).to_csv(header=False, index=False)
+    with open(TASKS_FILE, "a", newline="") as f:
+        f.write(("\n" if needs_newline else "") + text)
+
+
+def append_tasks(rows):
+    """Append activity rows to the hot file in a single write, without rewriting it"""
+    if rows.empty:
+        return
+    with locked():
+        _append_tasks_unlocked(rows)
+
+
+def commit_batch(activities, todo_ids=(), completed_on=None):
+    """Commit a batch of activities and to-do completions together.
+
+    Completed to-dos are also logged as activities, exactly like the To-Do page does.
+    The to-do file is rewritten at most once and all activity rows go out in one append.
+    Raises ValueError (and writes nothing) if a to-do ID is unknown or already completed.
+    Returns the to-do rows that were completed.
+    """
+    completed_on = _as_date_str(completed_on or datetime.date.today())
+    todo_ids = list(todo_ids)
+    with locked():
+        completed = pd.DataFrame(columns=TODO_COLUMNS)
+        if todo_ids:
+            todo_df = load_todos()
+            todo_df["ID"] = todo_df["ID"].astype(str)
+            ids = pd.Series(todo_ids, dtype=str)
+            pending = todo_df.loc[todo_df["Status"] != "Completed", "ID"]
+            invalid = ids[~ids.isin(pending)]
+            if not invalid.empty:
+                raise ValueError(f"Unknown or already completed to-do IDs: {', '.join(invalid.unique())}")
+
+            selected = todo_df["ID"].isin(ids)
+            if "Completed On" in todo_df.columns:
+                # An all-empty column is read back as float; make room for date strings
+                todo_df["Completed On"] = todo_df["Completed On"].astype(object)
+            todo_df.loc[selected, "Status"] = "Completed"
+            todo_df.loc[selected, "Completed On"] = completed_on
+            completed = todo_df[selected]
+            activities = pd.concat([activities, pd.DataFrame({
+                "Date": completed_on,
+                "Category": "Personal",
+                "Task": "Completed: " + completed["Task"].astype(str),
+                "Points": completed["Points"],
+                "Comment": "Completed to-do item: " + completed["Task"].astype(str),
+            })], ignore_index=True)
+            save_todos(todo_df)
+
+        if not activities.empty:
+            _append_tasks_unlocked(activities)
+    return completed
+
+
+def task_totals(tasks_df=None):
+    """All-time points and activity counts: archived totals plus the hot file"""
+    if tasks_df is None:
+        tasks_df = load_hot_tasks()
+    return _merge_totals(load_archive_summary()["totals"], _totals(tasks_df))
+
+
+def load_todos():
+    """Load the hot to-do list (pending items and recently completed ones)"""
+    return pd.read_csv(TODO_FILE)
+
+
+def save_todos(todo_df):
+    _write_csv(todo_df, TODO_FILE)
+
+
+def add_todos(rows):
+    """Add new to-do rows, re-reading the file under the lock so concurrent changes are kept"""
+    with locked():
+        save_todos(pd.concat([load_todos(), rows], ignore_index=True))
+
+
+def remove_todos(ids):
+    with locked():
+        todo_df = load_todos()
+        save_todos(todo_df[~todo_df["ID"].astype(str).isin([str(i) for i in ids])])
+
+
+def load_archived_todos():
+    """Load every archived (completed) to-do item"""
+    frames = _load_archive("todo")
+    if not frames:
+        return pd.DataFrame(columns=TODO_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _pending_path(kind):
+    return os.path.join(ARCHIVE_DIR, f"pending_{kind}.csv.gz")
+
+
+def _row_keys(df, columns):
+    """Hashable per-row keys that survive a CSV round trip (10 and 10.0 compare equal)"""
+    parts = []
+    for column in columns:
+        numeric = pd.to_numeric(df[column], errors="coerce")
+        text = pd.Series([str(value) for value in df[column].tolist()], index=df.index, dtype=object)
+        parts.append(numeric.map(repr).astype(object).where(numeric.notna(), text))
+    keys = pd.concat(parts, axis=1).agg("\x1f".join, axis=1) if parts else pd.Series("", index=df.index)
+    # Number repeated rows so identical activities are matched one for one
+    return keys + "\x1e" + keys.groupby(keys).cumcount().astype(str)
+
+
+def _without_rows(df, rows):
+    """Remove each of `rows` from df once (multiset difference over their shared columns)"""
+    if df.empty or rows.empty:
+        return df
+    columns = [column for column in df.columns if column in rows.columns]
+    return df[~_row_keys(df, columns).isin(set(_row_keys(rows, columns)))]
+
+
+def _append_to_archive(kind, rows, date_column, rollover_id):
+    """Append rows to their yearly archive files, tagged with the rollover that moved them.
+
+    Rows already carrying the same tag are leftovers of an interrupted attempt at this
+    rollover, so they are replaced rather than duplicated.
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    rows = rows.assign(**{"Archived On": rollover_id})
+    years = rows[date_column].astype(str).str[:4]
+    for year, year_rows in rows.groupby(years):
+        path = _archive_path(kind, year)
+        if os.path.exists(path):
+            existing = pd.read_csv(path, compression="gzip")
+            if "Archived On" in existing.columns:
+                existing = existing[existing["Archived On"].astype(str) != rollover_id]
+            year_rows = pd.concat([existing, year_rows], ignore_index=True)
+        _write_csv(year_rows, path, compression="gzip")
+
+
+def rollover(horizon_days=ARCHIVE_HORIZON_DAYS, today=None):
+    """Move activities and completed to-dos older than the horizon into yearly archives.
+
+    Runs at most once per day (plus whenever an interrupted rollover needs finishing);
+    returns the number of activities and to-dos archived.
+    """
+    today = today or datetime.date.today()
+    summary = load_archive_summary()
+    if summary["last_rollover"] == _as_date_str(today) and summary["pending_rollover"] is None:
+        return 0, 0
+    with locked():
+        return _rollover_unlocked(horizon_days, today)
+
+
+def _rollover_unlocked(horizon_days, today):
+    """Archive in steps that can each be redone, so a crash at any point is recoverable.
+
+    1. The rows to move are written to staging files, then a pending marker to the summary.
+    2. The staged rows are removed from the hot files.
+    3. The staged rows are appended to the yearly archives, tagged with the rollover id.
+    4. The summary gets the carried-forward totals and new cut-offs, and the marker is cleared.
+    A pending marker found on the next run means steps 2-4 are replayed from the staging files.
+    """
+    summary = load_archive_summary()
+    pending = summary["pending_rollover"]
+    recovering = pending is not None
+
+    if pending is None:
+        if summary["last_rollover"] == _as_date_str(today):
+            return 0, 0
+        cutoff = _as_date_str(today - datetime.timedelta(days=max(horizon_days, 7)))
+
+        # Activities
+        tasks_df = load_hot_tasks()
+        dates = tasks_df["Date"].astype(str).str[:10]
+        old_tasks = tasks_df[tasks_df["Date"].notna() & (dates < cutoff)]
+
+        # Completed to-dos, dated by completion (or due date for items completed before that was recorded)
+        todo_df = load_todos()
+        if "Completed On" not in todo_df.columns:
+            todo_df["Completed On"] = None
+        archive_dates = todo_df["Completed On"].fillna(todo_df["Due Date"])
+        old_todos = todo_df[(todo_df["Status"] == "Completed") & archive_dates.notna()
+                            & (archive_dates.astype(str).str[:10] < cutoff)]
+        old_todos = old_todos.assign(**{"Archive Date": archive_dates[old_todos.index]})
+
+        if old_tasks.empty and old_todos.empty:
+            summary["tasks_archived_before"] = max(filter(None, [summary["tasks_archived_before"], cutoff]))
+            summary["todos_archived_before"] = max(filter(None, [summary["todos_archived_before"], cutoff]))
+            summary["last_rollover"] = _as_date_str(today)
+            _save_archive_summary(summary)
+            return 0, 0
+
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        _write_csv(old_tasks, _pending_path("task_log"), compression="gzip")
+        _write_csv(old_todos, _pending_path("todo"), compression="gzip")
+        pending = {"id": _as_date_str(today), "cutoff": cutoff}
+        summary["pending_rollover"] = pending
+        _save_archive_summary(summary)
+
+    old_tasks = pd.read_csv(_pending_path("task_log"), compression="gzip")
+    old_todos = pd.read_csv(_pending_path("todo"), compression="gzip")
+
+    if not old_tasks.empty:
+        save_tasks(_without_rows(load_hot_tasks(), old_tasks))
+        _append_to_archive("task_log", old_tasks, "Date", pending["id"])
+    if not old_todos.empty:
+        save_todos(_without_rows(load_todos(), old_todos.drop(columns=["Archive Date"])))
+        _append_to_archive("todo", old_todos, "Archive Date", pending["id"])
+
+    summary["totals"] = _merge_totals(summary["totals"], _totals(old_tasks))
+    summary["tasks_archived_before"] = max(filter(None, [summary["tasks_archived_before"], pending["cutoff"]]))
+    summary["todos_archived_before"] = max(filter(None, [summary["todos_archived_before"], pending["cutoff"]]))
+    summary["last_rollover"] = pending["id"]
+    summary["pending_rollover"] = None
+    _save_archive_summary(summary)
+
+    for kind in ("task_log", "todo"):
+        try:
+            os.remove(_pending_path(kind))
+        except OSError:
+            pass
+
+    if recovering:
+        # The interrupted rollover may be from an earlier day, so today's still has to run
+        more_tasks, more_todos = _rollover_unlocked(horizon_days, today)
+        return len(old_tasks) + more_tasks, len(old_todos) + more_todos
+    return len(old_tasks), len(old_todos)
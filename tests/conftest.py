@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Point storage at empty data files in a temporary directory"""
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage, "TASKS_FILE", str(tmp_path / "task_log.csv"))
+    monkeypatch.setattr(storage, "TODO_FILE", str(tmp_path / "todo.csv"))
+    monkeypatch.setattr(storage, "HABITS_FILE", str(tmp_path / "habits.json"))
+    monkeypatch.setattr(storage, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(storage, "ARCHIVE_SUMMARY_FILE", str(tmp_path / "archive" / "summary.json"))
+    monkeypatch.setattr(storage, "LOCK_FILE", str(tmp_path / ".innerlevel.lock"))
+    storage._read_archive.cache_clear()
+    return tmp_path
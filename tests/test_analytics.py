@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+import analytics
+
+
+def _rollup(rows):
+    return analytics.daily_rollup(pd.DataFrame(rows, columns=["Date", "Category", "Points"]))
+
+
+ROLLUP = _rollup([
+    ["2023-01-01", "Personal", 5],       # a Sunday, in the first week column
+    ["2023-01-02", "Professional", 7],   # the first Monday, in the second column
+    ["2024-02-29", "Personal", 3],       # leap day
+    ["2024-02-29", "Professional", 4],
+    ["2024-12-31", "Personal", 11],      # last day of a leap year
+])
+
+
+def test_dates_land_in_their_cell():
+    years, grid, dates = analytics.calendar_grid(ROLLUP)
+
+    assert years.tolist() == [2023, 2024]
+    assert grid.shape == (2, 7, analytics.CALENDAR_WEEKS)
+    daily = ROLLUP.groupby("Date")["Points"].sum()
+    for date, points in daily.items():
+        y = date.year - years[0]
+        weekday = date.dayofweek
+        week = np.argwhere(dates[y, weekday] == np.datetime64(date.date()))
+        assert len(week) == 1
+        assert grid[y, weekday, week[0][0]] == points
+
+    # 2023-01-01 is a Sunday, so it sits in the first column after six padding days
+    assert grid[0, 6, 0] == 5
+    assert grid[0, 0, 1] == 7
+
+
+def test_cells_outside_each_year_are_nan():
+    years, grid, dates = analytics.calendar_grid(ROLLUP)
+
+    in_year = dates.astype("datetime64[Y]").astype(int) + 1970 == years[:, None, None]
+    assert np.isnan(grid[~in_year]).all()
+    assert not np.isnan(grid[in_year]).any()
+    # Every day of each year has exactly one cell
+    assert in_year[0].sum() == 365
+    assert in_year[1].sum() == 366
+
+
+def test_grid_total_matches_rollup():
+    _, grid, _ = analytics.calendar_grid(ROLLUP)
+    assert np.nansum(grid) == ROLLUP["Points"].sum()
+
+    _, personal, _ = analytics.calendar_grid(ROLLUP, ["Personal"])
+    assert np.nansum(personal) == ROLLUP.loc[ROLLUP["Category"] == "Personal", "Points"].sum()
+
+
+def test_empty_category_selection_returns_float_grid():
+    years, grid, _ = analytics.calendar_grid(ROLLUP, [])
+
+    assert grid.dtype == float
+    assert grid.shape == (len(years), 7, analytics.CALENDAR_WEEKS)
+    assert np.nansum(grid) == 0
+    assert np.all(np.isnan(grid) | (grid == 0))
@@ -0,0 +1,124 @@
+import io
+import json
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+import ingest
+import storage
+
+
+@pytest.fixture
+def habits(data_dir):
+    with open(storage.HABITS_FILE, "w") as f:
+        json.dump({"habits": [
+            {"name": "Daily Coding", "category": "Personal", "points": 10},
+            {"name": "Job Application", "category": "Professional", "points": 15},
+        ]}, f)
+    pd.DataFrame(columns=storage.TASK_COLUMNS).to_csv(storage.TASKS_FILE, index=False)
+    pd.DataFrame([["t1", "Ship it", "2025-05-01", "High", "Pending", 30, None]],
+                 columns=storage.TODO_COLUMNS).to_csv(storage.TODO_FILE, index=False)
+    ingest._habits_cache.clear()
+    return data_dir
+
+
+def test_ingest_batch_accepts_valid_batch(habits):
+    result = ingest.ingest_batch({
+        "activities": [
+            {"task": "Daily Coding", "date": "2025-05-02", "comment": "hook"},
+            {"task": "Job Application"},
+        ],
+        "todo_completions": [{"id": "t1"}],
+    })
+
+    assert result == {"activities": 2, "todo_completions": 1}
+    tasks = storage.load_hot_tasks()
+    assert tasks["Task"].tolist() == ["Daily Coding", "Job Application", "Completed: Ship it"]
+    assert tasks["Points"].tolist() == [10, 15, 30]
+    assert tasks["Category"].tolist()[:2] == ["Personal", "Professional"]
+    assert storage.load_todos().loc[0, "Status"] == "Completed"
+
+
+@pytest.mark.parametrize("batch, message", [
+    ({"activities": [{"task": "Unknown"}]}, "unknown habit"),
+    ({"activities": [{"task": "Daily Coding", "date": "2025-02-30"}]}, "invalid date"),
+    ({"activities": [{"task": "Daily Coding", "date": "05/02/2025"}]}, "invalid date"),
+    ({"activities": ["Daily Coding"]}, "JSON object"),
+    ({"activities": 5}, "'activities' must be a list"),
+    ({"todo_completions": 5}, "'todo_completions' must be a list"),
+    ({"todo_completions": "abc"}, "'todo_completions' must be a list"),
+    ({"todo_completions": [{}]}, r"todo_completions\[0\]: missing 'id'"),
+    ({"todo_completions": [["t1"]]}, r"todo_completions\[0\]: expected an ID string"),
+    ({"todo_completions": ["nope"]}, "already completed"),
+    ([{"task": "Daily Coding"}], "JSON object"),
+])
+def test_ingest_batch_rejects_invalid_batches(habits, batch, message):
+    with pytest.raises(ValueError, match=message):
+        ingest.ingest_batch(batch)
+
+
+def test_ingest_batch_is_all_or_nothing(habits):
+    with pytest.raises(ValueError):
+        ingest.ingest_batch({
+            "activities": [{"task": "Daily Coding"}],
+            "todo_completions": ["t1", "missing"],
+        })
+
+    assert storage.load_hot_tasks().empty
+    assert storage.load_todos().loc[0, "Status"] == "Pending"
+
+
+def test_main_exit_codes(habits, monkeypatch, tmp_path):
+    assert ingest.main(["log", "Daily Coding", "--comment", "cli"]) == 0
+    assert ingest.main(["log", "Unknown"]) == 1
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("{not json"))
+    assert ingest.main(["batch", "-"]) == 1
+    monkeypatch.setattr("sys.stdin", io.StringIO('{"todo_completions": 5}'))
+    assert ingest.main(["batch", "-"]) == 1
+    assert ingest.main(["batch", str(tmp_path / "missing.json")]) == 1
+
+    batch_file = tmp_path / "batch.json"
+    batch_file.write_text(json.dumps({"todo_completions": ["t1"]}))
+    assert ingest.main(["batch", str(batch_file)]) == 0
+    assert len(storage.load_hot_tasks()) == 2
+
+
+@pytest.fixture
+def server(habits):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ingest.IngestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(port, body, headers):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    connection.putrequest("POST", "/batch")
+    for name, value in headers.items():
+        connection.putheader(name, value)
+    connection.endheaders(body)
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    return response.status, payload
+
+
+@pytest.mark.parametrize("body, headers, status", [
+    (b'{"activities": [{"task": "Daily Coding"}]}', None, 200),
+    (b'{"activities": 5}', None, 400),
+    (b"{not json", None, 400),
+    (b"", {}, 411),
+    (b"", {"Content-Length": "abc"}, 400),
+    (b"", {"Content-Length": "-1"}, 400),
+    (b"", {"Content-Length": str(ingest.MAX_BODY_BYTES + 1)}, 413),
+])
+def test_http_status_codes(server, body, headers, status):
+    if headers is None:
+        headers = {"Content-Length": str(len(body))}
+    assert _post(server, body, headers)[0] == status
@@ -0,0 +1,139 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import storage
+
+TODAY = datetime.date(2025, 5, 3)
+HORIZON = 365  # cut-off is 2024-05-03
+
+
+@pytest.fixture
+def populated(data_dir):
+    tasks = pd.DataFrame([
+        ["2022-03-01", "Personal", "Reading", 10, "old"],
+        ["2023-07-15", "Professional", "Job Application", 15, ""],
+        ["2023-07-15", "Professional", "Job Application", 15, ""],
+        ["2024-05-02", "Learning", "Course", 20, "only archived category"],
+        ["2024-05-03", "Personal", "Exercise", 5, ""],
+        ["2025-05-01", "Professional", "LinkedIn Post", 15, "recent"],
+    ], columns=storage.TASK_COLUMNS)
+    tasks.to_csv(storage.TASKS_FILE, index=False)
+    todos = pd.DataFrame([
+        ["a", "Old done", "2023-01-01", "High", "Completed", 30, None],
+        ["b", "Recent done", "2023-01-01", "Low", "Completed", 10, "2025-05-01"],
+        ["c", "Pending", "2023-01-01", "Medium", "Pending", 20, None],
+    ], columns=storage.TODO_COLUMNS)
+    todos.to_csv(storage.TODO_FILE, index=False)
+    return tasks
+
+
+def test_rollover_keeps_totals(populated):
+    before = storage.task_totals()
+
+    assert storage.rollover(HORIZON, TODAY) == (4, 1)
+
+    assert storage.task_totals() == before
+    assert len(storage.load_hot_tasks()) == 2
+    assert storage.load_todos()["ID"].tolist() == ["b", "c"]
+    assert storage.load_archived_todos()["ID"].tolist() == ["a"]
+
+
+def test_range_queries_before_and_after_cutoff(populated, monkeypatch):
+    storage.rollover(HORIZON, TODAY)
+
+    assert len(storage.load_tasks("2023-01-01", "2023-12-31")) == 2
+    assert len(storage.load_tasks("2024-05-01", "2024-05-31")) == 2
+    assert len(storage.load_tasks()) == len(populated)
+    hot_columns = storage.load_hot_tasks().columns.tolist()
+    assert storage.load_tasks("2024-01-01", "2025-12-31").columns.tolist() == hot_columns
+    assert storage.load_tasks().columns.tolist() == hot_columns
+
+    # Ranges after the cut-off never touch the archive
+    def fail(*args):
+        raise AssertionError("archive read for a hot-only range")
+    monkeypatch.setattr(storage, "_read_archive", fail)
+    assert storage.load_tasks("2025-01-01")["Task"].tolist() == ["LinkedIn Post"]
+
+
+def test_backdated_row_after_rollover(populated):
+    storage.rollover(HORIZON, TODAY)
+    backdated = pd.DataFrame([["2023-07-16", "Personal", "Reading", 10, "late entry"]],
+                             columns=storage.TASK_COLUMNS)
+    storage.append_tasks(backdated)
+    totals = storage.task_totals()
+
+    assert totals["points"] == populated["Points"].sum() + 10
+    assert len(storage.load_tasks("2023-07-01", "2023-07-31")) == 3
+
+    # The next day's rollover moves it (and the 2024-05-03 row now past the horizon) into the archive
+    assert storage.rollover(HORIZON, TODAY + datetime.timedelta(days=1)) == (2, 0)
+    assert storage.task_totals() == totals
+    assert len(storage.load_tasks("2023-07-01", "2023-07-31")) == 3
+
+
+def test_second_rollover_same_day_is_noop(populated):
+    storage.rollover(HORIZON, TODAY)
+    summary = storage.load_archive_summary()
+    hot = storage.load_hot_tasks()
+
+    assert storage.rollover(HORIZON, TODAY) == (0, 0)
+    assert storage.load_archive_summary() == summary
+    pd.testing.assert_frame_equal(storage.load_hot_tasks(), hot)
+
+
+@pytest.mark.parametrize("crash_point", ["hot", "archive", "summary"])
+def test_interrupted_rollover_recovers(populated, monkeypatch, crash_point):
+    before = storage.task_totals()
+    targets = {"hot": "save_tasks", "archive": "_append_to_archive", "summary": "_save_archive_summary"}
+    original = getattr(storage, targets[crash_point])
+    calls = []
+
+    def crash(*args, **kwargs):
+        calls.append(1)
+        # The summary is saved once to mark the rollover pending; crash on the final commit
+        if crash_point != "summary" or len(calls) > 1:
+            raise RuntimeError("simulated crash")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(storage, targets[crash_point], crash)
+    with pytest.raises(RuntimeError):
+        storage.rollover(HORIZON, TODAY)
+    monkeypatch.setattr(storage, targets[crash_point], original)
+
+    storage.rollover(HORIZON, TODAY)
+    assert storage.load_archive_summary()["pending_rollover"] is None
+    assert storage.task_totals() == before
+    assert len(storage.load_tasks()) == len(populated)
+    assert len(storage.load_hot_tasks()) == 2
+
+
+def test_commit_batch_completes_todos_and_logs_activities(populated):
+    activities = pd.DataFrame([["2025-05-03", "Personal", "Reading", 10, ""]], columns=storage.TASK_COLUMNS)
+
+    completed = storage.commit_batch(activities, ["c"], completed_on=TODAY)
+
+    assert completed["ID"].tolist() == ["c"]
+    todos = storage.load_todos().set_index("ID")
+    assert todos.loc["c", "Status"] == "Completed"
+    assert todos.loc["c", "Completed On"] == "2025-05-03"
+    assert storage.load_hot_tasks()["Task"].tolist()[-2:] == ["Reading", "Completed: Pending"]
+
+
+def test_commit_batch_rejects_whole_batch(populated):
+    activities = pd.DataFrame([["2025-05-03", "Personal", "Reading", 10, ""]], columns=storage.TASK_COLUMNS)
+
+    with pytest.raises(ValueError, match="missing"):
+        storage.commit_batch(activities, ["c", "missing"])
+    with pytest.raises(ValueError, match="a"):
+        storage.commit_batch(activities, ["a"])
+
+    assert len(storage.load_hot_tasks()) == len(populated)
+    assert storage.load_todos().set_index("ID").loc["c", "Status"] == "Pending"
+
+
+@pytest.mark.parametrize("value, expected", [("180", 180), ("3", 7), ("a year", 365), ("", 365)])
+def test_horizon_from_env(monkeypatch, value, expected):
+    monkeypatch.setenv("INNERLEVEL_ARCHIVE_HORIZON_DAYS", value)
+    assert storage._horizon_from_env() == expected